@@ -0,0 +1,38 @@
+import os
+
+from cachetools import TTLCache
+
+# Caché con expiración para lecturas por id (estudiantes y cursos).
+# Vive dentro de cada proceso: invalidar() solo limpia el worker que atendió la escritura,
+# así que con varios workers se desactiva (CACHE_POR_ID=0) para no servir datos obsoletos.
+CACHE_ACTIVA = os.getenv("CACHE_POR_ID", "1") == "1"
+MAX_ENTRADAS = 10_000
+TTL_SEGUNDOS = 60
+
+_cache = TTLCache(maxsize=MAX_ENTRADAS, ttl=TTL_SEGUNDOS)
+# Cambia en cada invalidación; una lectura en curso durante una escritura no se guarda
+_generacion = 0
+
+
+async def obtener_cacheado(sesion, modelo, id):
+    """Retorna el registro como dict, consultando la BD solo si no está en caché"""
+    clave = (modelo.__name__, id)
+    datos = _cache.get(clave)
+    if datos is not None:
+        return datos
+
+    generacion = _generacion
+    objeto = await sesion.get(modelo, id)
+    if not objeto:
+        return None
+
+    datos = objeto.model_dump()
+    if CACHE_ACTIVA and generacion == _generacion:
+        _cache[clave] = datos
+    return datos
+
+
+def invalidar(modelo, id):
+    global _generacion
+    _generacion += 1
+    _cache.pop((modelo.__name__, id), None)
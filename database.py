@@ -1,13 +1,100 @@
-from sqlmodel import SQLModel, create_engine, Session
+from sqlalchemy import Integer, column, event, inspect, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 # Configuración de la base de datos
-sqlite_url = "sqlite:///universidad.db"
-engine = create_engine(sqlite_url, echo=True)
+sqlite_url = "sqlite+aiosqlite:///universidad.db"
 
-def crear_bd_tablas():
-    SQLModel.metadata.create_all(engine)
+# Cada worker de uvicorn crea su propio engine, así que el pool es por proceso
+engine = create_async_engine(
+    sqlite_url,
+    echo=False,
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=10,
+    max_overflow=5,
+    pool_pre_ping=True,
+    pool_recycle=1800
+)
+
+SesionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+@event.listens_for(engine.sync_engine, "connect")
+def configurar_sqlite(conexion_dbapi, registro_conexion):
+    # WAL permite lecturas concurrentes mientras hay una escritura en curso
+    cursor = conexion_dbapi.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.execute("PRAGMA cache_size=-64000")
+    # Necesario para que se apliquen los ON DELETE CASCADE
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+# Índice FTS5 por trigramas sobre curso, sincronizado mediante triggers
+SQL_CURSO_FTS = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS curso_fts USING fts5(
+        codigo, nombre, content='curso', content_rowid='id', tokenize='trigram'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS curso_fts_ai AFTER INSERT ON curso BEGIN
+        INSERT INTO curso_fts(rowid, codigo, nombre) VALUES (new.id, new.codigo, new.nombre);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS curso_fts_ad AFTER DELETE ON curso BEGIN
+        INSERT INTO curso_fts(curso_fts, rowid, codigo, nombre) VALUES ('delete', old.id, old.codigo, old.nombre);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS curso_fts_au AFTER UPDATE ON curso BEGIN
+        INSERT INTO curso_fts(curso_fts, rowid, codigo, nombre) VALUES ('delete', old.id, old.codigo, old.nombre);
+        INSERT INTO curso_fts(rowid, codigo, nombre) VALUES (new.id, new.codigo, new.nombre);
+    END""",
+]
+
+# Ids de cursos cuyo código contiene el término (subconsulta para listar_cursos)
+CURSOS_POR_CODIGO = text(
+    "SELECT rowid FROM curso_fts WHERE curso_fts MATCH :termino"
+).columns(column("rowid", Integer))
+
+
+# Bases creadas antes de uq_matricula: create_all no agrega restricciones a tablas existentes
+SQL_TIENE_UQ_MATRICULA = """
+    SELECT 1 FROM sqlite_master
+    WHERE (type = 'index' AND name = 'uq_matricula')
+       OR (type = 'table' AND name = 'matricula' AND sql LIKE '%uq_matricula%')
+"""
+SQL_UQ_MATRICULA = [
+    """DELETE FROM matricula WHERE id NOT IN (
+        SELECT MIN(id) FROM matricula GROUP BY estudiante_id, curso_id
+    )""",
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_matricula ON matricula(estudiante_id, curso_id)",
+]
+
+
+async def crear_bd_tablas():
+    async with engine.begin() as conexion:
+        # Una sola introspección; si el esquema ya está completo no se ejecuta DDL
+        tablas = set(await conexion.run_sync(lambda c: inspect(c).get_table_names()))
+        if not tablas >= set(SQLModel.metadata.tables) | {"curso_fts"}:
+            await conexion.run_sync(SQLModel.metadata.create_all)
+            for sentencia in SQL_CURSO_FTS:
+                await conexion.exec_driver_sql(sentencia)
+            if "curso_fts" not in tablas:
+                # Indexar los cursos que ya existían
+                await conexion.exec_driver_sql("INSERT INTO curso_fts(curso_fts) VALUES ('rebuild')")
+
+        # Siempre se verifica: las matrículas duplicadas dependen de esta restricción
+        if not (await conexion.exec_driver_sql(SQL_TIENE_UQ_MATRICULA)).first():
+            for sentencia in SQL_UQ_MATRICULA:
+                await conexion.exec_driver_sql(sentencia)
+
+async def analizar_bd():
+    # Estadísticas para el planificador (sqlite_stat1)
+    async with engine.begin() as conexion:
+        await conexion.exec_driver_sql("ANALYZE")
+
+async def obtener_sesion():
+    async with SesionLocal() as sesion:
+        yield sesion
 
-def obtener_sesion():
-    with Session(engine) as sesion:
-        yield sesion 
- 
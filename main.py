@@ -1,90 +1,175 @@
+import os
+
+import orjson
 from fastapi import FastAPI, Depends, HTTPException
-from sqlmodel import Session, select
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import bindparam, delete, func, insert, text
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import List, Optional
 
-from database import engine, crear_bd_tablas, obtener_sesion
-from models import Estudiante, Curso, Matricula
+from cache import obtener_cacheado, invalidar
+from database import engine, SesionLocal, crear_bd_tablas, analizar_bd, obtener_sesion, CURSOS_POR_CODIGO
+from models import Estudiante, Curso, Matricula, MatriculaCrear, EstudianteRead, CursoRead
 
 app = FastAPI(
     title="Sistema de Gestión Universitaria",
     description="API para gestionar estudiantes, cursos y matrículas",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
+)
+
+
+# Sentencias frecuentes construidas una sola vez; SQLAlchemy reutiliza su compilación
+CEDULA_REGISTRADA = select(Estudiante.id).where(Estudiante.cedula == bindparam("cedula")).limit(1)
+CODIGO_REGISTRADO = select(Curso.id).where(Curso.codigo == bindparam("codigo")).limit(1)
+NOMBRES_MATRICULA = select(
+    select(Estudiante.nombre).where(Estudiante.id == bindparam("estudiante_id")).scalar_subquery(),
+    select(Curso.nombre).where(Curso.id == bindparam("curso_id")).scalar_subquery()
+)
+INSERTAR_MATRICULAS = (
+    insert(Matricula.__table__)
+    .prefix_with("OR IGNORE")
+    .returning(Matricula.__table__.c.id)
 )
 
 
+# Límites del endpoint de matrícula en lote
+MAX_MATRICULAS_LOTE = 1000
+MAX_IDS_REPORTADOS = 10
+
+# Filas que se leen de la BD y se envían al cliente en cada bloque de los listados
+FILAS_POR_BLOQUE = 500
+
+
+async def respuesta_json(consulta):
+    """
+    Envía las filas de la consulta como un arreglo JSON, por bloques de FILAS_POR_BLOQUE
+    - El primer bloque se lee antes de responder: un error de BD sigue siendo un 500
+    - La conexión (y su lectura en WAL) queda ocupada hasta terminar el envío
+    - Las filas no pasan por response_model; en estos endpoints solo documenta el esquema
+    """
+    # Sesión propia: el envío continúa después de retornar el endpoint
+    sesion = SesionLocal()
+    try:
+        resultado = await sesion.stream(consulta.execution_options(yield_per=FILAS_POR_BLOQUE))
+        bloques = resultado.mappings().partitions()
+        try:
+            primero = await bloques.__anext__()
+        except StopAsyncIteration:
+            primero = []
+    except Exception:
+        await sesion.close()
+        raise
+
+    async def generar():
+        try:
+            yield b"[" + b",".join(orjson.dumps(dict(fila)) for fila in primero)
+            async for filas in bloques:
+                yield b"," + b",".join(orjson.dumps(dict(fila)) for fila in filas)
+            yield b"]"
+        finally:
+            await sesion.close()
+
+    return StreamingResponse(generar(), media_type="application/json")
+
+
+async def optimizar_bd(sesion):
+    """Re-analiza las tablas cuyas estadísticas quedaron obsoletas tras una escritura masiva"""
+    # PRAGMA vía text() no dispara el autoflush: enviar antes los cambios pendientes
+    await sesion.flush()
+    await sesion.exec(text("PRAGMA optimize"))
+
+
+async def ids_faltantes(sesion, columna, ids):
+    """Retorna los ids que no existen, consultándolos todos con un solo WHERE id IN (...)"""
+    presentes = set((await sesion.exec(select(columna).where(columna.in_(list(ids))))).all())
+    return sorted(set(ids) - presentes)
+
+
+def describir_ids(ids):
+    """Lista los primeros MAX_IDS_REPORTADOS ids para los mensajes de error"""
+    texto = ", ".join(str(id) for id in ids[:MAX_IDS_REPORTADOS])
+    if len(ids) > MAX_IDS_REPORTADOS:
+        texto += f" y {len(ids) - MAX_IDS_REPORTADOS} más"
+    return texto
+
+
 @app.on_event("startup")
-def iniciar_aplicacion():
-    crear_bd_tablas()
+async def iniciar_aplicacion():
+    # Con RUN_MIGRATIONS=0 los workers no ejecutan DDL ni ANALYZE al arrancar
+    if os.getenv("RUN_MIGRATIONS", "1") == "1":
+        await crear_bd_tablas()
+        await analizar_bd()
 
 
 # ==================== 👨‍🎓 GESTIÓN DE ESTUDIANTES ====================
 
 @app.post("/estudiantes/", response_model=Estudiante, tags=["Estudiantes"])
-def crear_estudiante(estudiante: Estudiante, sesion: Session = Depends(obtener_sesion)):
+async def crear_estudiante(estudiante: Estudiante, sesion: AsyncSession = Depends(obtener_sesion)):
     """
     CREAR NUEVO ESTUDIANTE
     - Valida que la cédula sea única
     - Semestre debe estar entre 1 y 12
     """
     # Validar cédula única
-    existente = sesion.exec(select(Estudiante).where(Estudiante.cedula == estudiante.cedula)).first()
-    if existente:
+    existente = await sesion.scalar(CEDULA_REGISTRADA, {"cedula": estudiante.cedula})
+    if existente is not None:
         raise HTTPException(status_code=400, detail="❌ La cédula ya está registrada")
 
     sesion.add(estudiante)
-    sesion.commit()
-    sesion.refresh(estudiante)
+    await sesion.commit()
+    await sesion.refresh(estudiante)
     return estudiante
 
 
-@app.get("/estudiantes/", response_model=List[Estudiante], tags=["Estudiantes"])
-def listar_estudiantes(
-        semestre: Optional[int] = None,
-        sesion: Session = Depends(obtener_sesion)
-):
+@app.get("/estudiantes/", response_model=List[EstudianteRead], tags=["Estudiantes"])
+async def listar_estudiantes(semestre: Optional[int] = None):
     """
     LISTAR ESTUDIANTES
     - Filtro opcional por semestre
     - Retorna lista completa si no hay filtro
+    - La respuesta se envía por partes (streaming, sin validar contra response_model)
     """
-    consulta = select(Estudiante)
+    consulta = select(
+        Estudiante.id, Estudiante.cedula, Estudiante.nombre, Estudiante.email, Estudiante.semestre
+    )
     if semestre:
         consulta = consulta.where(Estudiante.semestre == semestre)
-    estudiantes = sesion.exec(consulta).all()
-    return estudiantes
+    return await respuesta_json(consulta)
 
 
 @app.get("/estudiantes/{estudiante_id}", response_model=Estudiante, tags=["Estudiantes"])
-def obtener_estudiante(estudiante_id: int, sesion: Session = Depends(obtener_sesion)):
+async def obtener_estudiante(estudiante_id: int, sesion: AsyncSession = Depends(obtener_sesion)):
     """
     OBTENER ESTUDIANTE POR ID
     - Retorna error 404 si no existe
     """
-    estudiante = sesion.get(Estudiante, estudiante_id)
+    estudiante = await obtener_cacheado(sesion, Estudiante, estudiante_id)
     if not estudiante:
         raise HTTPException(status_code=404, detail="❌ Estudiante no encontrado")
     return estudiante
 
 
 @app.put("/estudiantes/{estudiante_id}", response_model=Estudiante, tags=["Estudiantes"])
-def actualizar_estudiante(
+async def actualizar_estudiante(
         estudiante_id: int,
         datos_actualizacion: Estudiante,
-        sesion: Session = Depends(obtener_sesion)
+        sesion: AsyncSession = Depends(obtener_sesion)
 ):
     """
     ACTUALIZAR ESTUDIANTE
     - Valida cédula única si se modifica
     - Actualiza todos los campos
     """
-    estudiante_db = sesion.get(Estudiante, estudiante_id)
+    estudiante_db = await sesion.get(Estudiante, estudiante_id)
     if not estudiante_db:
         raise HTTPException(status_code=404, detail="❌ Estudiante no encontrado")
 
     # Validar cédula única si se cambia
     if datos_actualizacion.cedula != estudiante_db.cedula:
-        existente = sesion.exec(select(Estudiante).where(Estudiante.cedula == datos_actualizacion.cedula)).first()
-        if existente:
+        existente = await sesion.scalar(CEDULA_REGISTRADA, {"cedula": datos_actualizacion.cedula})
+        if existente is not None:
             raise HTTPException(status_code=400, detail="❌ La cédula ya está registrada")
 
     # Actualizar campos
@@ -94,102 +179,105 @@ def actualizar_estudiante(
     estudiante_db.semestre = datos_actualizacion.semestre
 
     sesion.add(estudiante_db)
-    sesion.commit()
-    sesion.refresh(estudiante_db)
+    await sesion.commit()
+    invalidar(Estudiante, estudiante_id)
+    await sesion.refresh(estudiante_db)
     return estudiante_db
 
 
 @app.delete("/estudiantes/{estudiante_id}", tags=["Estudiantes"])
-def eliminar_estudiante(estudiante_id: int, sesion: Session = Depends(obtener_sesion)):
+async def eliminar_estudiante(estudiante_id: int, sesion: AsyncSession = Depends(obtener_sesion)):
     """
     ELIMINAR ESTUDIANTE
     - Elimina en cascada todas sus matrículas
     - Retorna confirmación
     """
-    estudiante = sesion.get(Estudiante, estudiante_id)
+    estudiante = await sesion.get(Estudiante, estudiante_id)
     if not estudiante:
         raise HTTPException(status_code=404, detail="❌ Estudiante no encontrado")
 
     # Eliminar matrículas del estudiante (cascada)
-    matriculas = sesion.exec(select(Matricula).where(Matricula.estudiante_id == estudiante_id)).all()
-    for matricula in matriculas:
-        sesion.delete(matricula)
+    await sesion.exec(delete(Matricula).where(Matricula.estudiante_id == estudiante_id))
 
-    sesion.delete(estudiante)
-    sesion.commit()
+    await sesion.delete(estudiante)
+    await optimizar_bd(sesion)
+    await sesion.commit()
+    invalidar(Estudiante, estudiante_id)
     return {"mensaje": "✅ Estudiante eliminado correctamente"}
 
 
 # ==================== 📚 GESTIÓN DE CURSOS ====================
 
 @app.post("/cursos/", response_model=Curso, tags=["Cursos"])
-def crear_curso(curso: Curso, sesion: Session = Depends(obtener_sesion)):
+async def crear_curso(curso: Curso, sesion: AsyncSession = Depends(obtener_sesion)):
     """
     CREAR NUEVO CURSO
     - Valida que el código sea único
     - Créditos deben estar entre 1 y 10
     """
-    existente = sesion.exec(select(Curso).where(Curso.codigo == curso.codigo)).first()
-    if existente:
+    existente = await sesion.scalar(CODIGO_REGISTRADO, {"codigo": curso.codigo})
+    if existente is not None:
         raise HTTPException(status_code=400, detail="❌ El código del curso ya existe")
 
     sesion.add(curso)
-    sesion.commit()
-    sesion.refresh(curso)
+    await sesion.commit()
+    await sesion.refresh(curso)
     return curso
 
 
-@app.get("/cursos/", response_model=List[Curso], tags=["Cursos"])
-def listar_cursos(
-        creditos: Optional[int] = None,
-        codigo: Optional[str] = None,
-        sesion: Session = Depends(obtener_sesion)
-):
+@app.get("/cursos/", response_model=List[CursoRead], tags=["Cursos"])
+async def listar_cursos(creditos: Optional[int] = None, codigo: Optional[str] = None):
     """
     LISTAR CURSOS
     - Filtros opcionales por créditos y código
     - Búsqueda parcial en código
+    - La respuesta se envía por partes (streaming, sin validar contra response_model)
     """
-    consulta = select(Curso)
+    consulta = select(Curso.id, Curso.codigo, Curso.nombre, Curso.creditos, Curso.horario)
     if creditos:
         consulta = consulta.where(Curso.creditos == creditos)
     if codigo:
-        consulta = consulta.where(Curso.codigo.contains(codigo))
-    cursos = sesion.exec(consulta).all()
-    return cursos
+        if len(codigo) >= 3:
+            # Búsqueda por trigramas en el índice FTS5
+            termino = 'codigo : "' + codigo.replace('"', '""') + '"'
+            consulta = consulta.where(Curso.id.in_(CURSOS_POR_CODIGO.bindparams(termino=termino)))
+        else:
+            # El índice de trigramas necesita al menos 3 caracteres
+            consulta = consulta.where(Curso.codigo.contains(codigo))
+    return await respuesta_json(consulta)
 
 
 @app.get("/cursos/{curso_id}", response_model=Curso, tags=["Cursos"])
-def obtener_curso(curso_id: int, sesion: Session = Depends(obtener_sesion)):
+async def obtener_curso(curso_id: int, sesion: AsyncSession = Depends(obtener_sesion)):
     """
     OBTENER CURSO POR ID
     - Retorna error 404 si no existe
     """
-    curso = sesion.get(Curso, curso_id)
+    curso = await obtener_cacheado(sesion, Curso, curso_id)
     if not curso:
         raise HTTPException(status_code=404, detail="❌ Curso no encontrado")
     return curso
 
 
 @app.put("/cursos/{curso_id}", response_model=Curso, tags=["Cursos"])
-def actualizar_curso(
+async def actualizar_curso(
         curso_id: int,
         datos_actualizacion: Curso,
-        sesion: Session = Depends(obtener_sesion)
+        sesion: AsyncSession = Depends(obtener_sesion)
 ):
     """
     ACTUALIZAR CURSO
     - Valida código único si se modifica
     - Actualiza todos los campos
     """
-    curso_db = sesion.get(Curso, curso_id)
+    curso_db = await sesion.get(Curso, curso_id)
     if not curso_db:
         raise HTTPException(status_code=404, detail="❌ Curso no encontrado")
 
     # Validar código único si se cambia
     if datos_actualizacion.codigo != curso_db.codigo:
-        existente = sesion.exec(select(Curso).where(Curso.codigo == datos_actualizacion.codigo)).first()
-        if existente:
+        existente = await sesion.scalar(CODIGO_REGISTRADO, {"codigo": datos_actualizacion.codigo})
+        if existente is not None:
             raise HTTPException(status_code=400, detail="❌ El código del curso ya existe")
 
     # Actualizar campos
@@ -199,162 +287,195 @@ def actualizar_curso(
     curso_db.horario = datos_actualizacion.horario
 
     sesion.add(curso_db)
-    sesion.commit()
-    sesion.refresh(curso_db)
+    await sesion.commit()
+    invalidar(Curso, curso_id)
+    await sesion.refresh(curso_db)
     return curso_db
 
 
 @app.delete("/cursos/{curso_id}", tags=["Cursos"])
-def eliminar_curso(curso_id: int, sesion: Session = Depends(obtener_sesion)):
+async def eliminar_curso(curso_id: int, sesion: AsyncSession = Depends(obtener_sesion)):
     """
     ELIMINAR CURSO
     - Elimina en cascada todas sus matrículas
     - Retorna confirmación
     """
-    curso = sesion.get(Curso, curso_id)
+    curso = await sesion.get(Curso, curso_id)
     if not curso:
         raise HTTPException(status_code=404, detail="❌ Curso no encontrado")
 
     # Eliminar matrículas del curso (cascada)
-    matriculas = sesion.exec(select(Matricula).where(Matricula.curso_id == curso_id)).all()
-    for matricula in matriculas:
-        sesion.delete(matricula)
+    await sesion.exec(delete(Matricula).where(Matricula.curso_id == curso_id))
 
-    sesion.delete(curso)
-    sesion.commit()
+    await sesion.delete(curso)
+    await optimizar_bd(sesion)
+    await sesion.commit()
+    invalidar(Curso, curso_id)
     return {"mensaje": "✅ Curso eliminado correctamente"}
 
 
 # ==================== 🎫 GESTIÓN DE MATRÍCULAS ====================
 
 @app.post("/matriculas/", tags=["Matrículas"])
-def matricular_estudiante(
+async def matricular_estudiante(
         estudiante_id: int,
         curso_id: int,
-        sesion: Session = Depends(obtener_sesion)
+        sesion: AsyncSession = Depends(obtener_sesion)
 ):
     """
     MATRICULAR ESTUDIANTE EN CURSO
     - Valida que no exista matrícula duplicada
     - Verifica que existan estudiante y curso
     """
-    # Verificar si ya está matriculado
-    existente = sesion.exec(
-        select(Matricula).where(
-            Matricula.estudiante_id == estudiante_id,
-            Matricula.curso_id == curso_id
-        )
-    ).first()
+    # Verificar que existan estudiante y curso (una sola consulta)
+    estudiante, curso = (await sesion.exec(
+        NOMBRES_MATRICULA,
+        params={"estudiante_id": estudiante_id, "curso_id": curso_id}
+    )).one()
+    if estudiante is None:
+        raise HTTPException(status_code=404, detail="❌ Estudiante no encontrado")
+    if curso is None:
+        raise HTTPException(status_code=404, detail="❌ Curso no encontrado")
 
-    if existente:
+    # Crear matrícula; uq_matricula descarta el duplicado y no retorna id
+    creada = (await sesion.exec(
+        INSERTAR_MATRICULAS,
+        params={"estudiante_id": estudiante_id, "curso_id": curso_id}
+    )).first()
+    if creada is None:
         raise HTTPException(status_code=400, detail="❌ El estudiante ya está matriculado en este curso")
+    await sesion.commit()
 
-    # Verificar que existan estudiante y curso
-    estudiante = sesion.get(Estudiante, estudiante_id)
-    if not estudiante:
-        raise HTTPException(status_code=404, detail="❌ Estudiante no encontrado")
+    return {
+        "mensaje": "✅ Estudiante matriculado exitosamente",
+        "estudiante": estudiante,
+        "curso": curso
+    }
 
-    curso = sesion.get(Curso, curso_id)
-    if not curso:
-        raise HTTPException(status_code=404, detail="❌ Curso no encontrado")
 
-    # Crear matrícula
-    matricula = Matricula(estudiante_id=estudiante_id, curso_id=curso_id)
-    sesion.add(matricula)
-    sesion.commit()
-    sesion.refresh(matricula)
+@app.post("/matriculas/bulk", tags=["Matrículas"])
+async def matricular_estudiantes_lote(
+        matriculas: List[MatriculaCrear],
+        sesion: AsyncSession = Depends(obtener_sesion)
+):
+    """
+    MATRICULAR EN LOTE
+    - Registra todas las matrículas en una sola transacción
+    - Verifica que existan todos los estudiantes y cursos
+    - Ignora las matrículas que ya existen
+    - Máximo MAX_MATRICULAS_LOTE matrículas por solicitud
+    """
+    if not matriculas:
+        raise HTTPException(status_code=400, detail="❌ No se enviaron matrículas")
+    if len(matriculas) > MAX_MATRICULAS_LOTE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"❌ Máximo {MAX_MATRICULAS_LOTE} matrículas por lote"
+        )
+
+    # Verificar que existan estudiantes y cursos (una consulta por tabla)
+    faltantes = await ids_faltantes(sesion, Estudiante.id, {m.estudiante_id for m in matriculas})
+    if faltantes:
+        raise HTTPException(status_code=404, detail=f"❌ Estudiantes no encontrados: {describir_ids(faltantes)}")
+
+    faltantes = await ids_faltantes(sesion, Curso.id, {m.curso_id for m in matriculas})
+    if faltantes:
+        raise HTTPException(status_code=404, detail=f"❌ Cursos no encontrados: {describir_ids(faltantes)}")
+
+    # Insertar en bloque (insertmanyvalues); uq_matricula descarta los duplicados
+    resultado = await sesion.exec(
+        INSERTAR_MATRICULAS,
+        params=[m.model_dump() for m in matriculas]
+    )
+    creadas = len(resultado.all())
+    await optimizar_bd(sesion)
+    await sesion.commit()
 
     return {
-        "mensaje": "✅ Estudiante matriculado exitosamente",
-        "estudiante": estudiante.nombre,
-        "curso": curso.nombre
+        "mensaje": "✅ Matrículas registradas exitosamente",
+        "matriculas_creadas": creadas,
+        "matriculas_ignoradas": len(matriculas) - creadas
     }
 
 
 @app.delete("/matriculas/{estudiante_id}/{curso_id}", tags=["Matrículas"])
-def desmatricular_estudiante(
+async def desmatricular_estudiante(
         estudiante_id: int,
         curso_id: int,
-        sesion: Session = Depends(obtener_sesion)
+        sesion: AsyncSession = Depends(obtener_sesion)
 ):
     """
     DESMATRICULAR ESTUDIANTE DE CURSO
     - Elimina la relación de matrícula
     - Retorna confirmación
     """
-    matricula = sesion.exec(
+    matricula = (await sesion.exec(
         select(Matricula).where(
             Matricula.estudiante_id == estudiante_id,
             Matricula.curso_id == curso_id
         )
-    ).first()
+    )).first()
 
     if not matricula:
         raise HTTPException(status_code=404, detail="❌ Matrícula no encontrada")
 
-    sesion.delete(matricula)
-    sesion.commit()
+    await sesion.delete(matricula)
+    await sesion.commit()
     return {"mensaje": "✅ Estudiante desmatriculado exitosamente"}
 
 
 # ==================== 🔍 CONSULTAS Y REPORTES ====================
 
 @app.get("/estudiantes/{estudiante_id}/cursos", tags=["Consultas"])
-def cursos_del_estudiante(estudiante_id: int, sesion: Session = Depends(obtener_sesion)):
+async def cursos_del_estudiante(estudiante_id: int, sesion: AsyncSession = Depends(obtener_sesion)):
     """
     CONSULTAR CURSOS DE UN ESTUDIANTE
     - Retorna estudiante y lista de sus cursos matriculados
     """
-    estudiante = sesion.get(Estudiante, estudiante_id)
+    estudiante = await sesion.get(Estudiante, estudiante_id)
     if not estudiante:
         raise HTTPException(status_code=404, detail="❌ Estudiante no encontrado")
 
-    # Obtener matrículas del estudiante
-    matriculas = sesion.exec(select(Matricula).where(Matricula.estudiante_id == estudiante_id)).all()
-
-    # Obtener cursos de las matrículas
-    cursos = []
-    for matricula in matriculas:
-        curso = sesion.get(Curso, matricula.curso_id)
-        if curso:
-            cursos.append(curso)
+    # Obtener cursos matriculados y su total en una sola consulta
+    filas = (await sesion.exec(
+        select(Curso, func.count().over().label("total"))
+        .join(Matricula, Matricula.curso_id == Curso.id)
+        .where(Matricula.estudiante_id == estudiante_id)
+    )).all()
 
     return {
         "estudiante": estudiante,
-        "cursos_matriculados": cursos,
-        "total_cursos": len(cursos)
+        "cursos_matriculados": [fila.Curso for fila in filas],
+        "total_cursos": filas[0].total if filas else 0
     }
 
 
 @app.get("/cursos/{curso_id}/estudiantes", tags=["Consultas"])
-def estudiantes_del_curso(curso_id: int, sesion: Session = Depends(obtener_sesion)):
+async def estudiantes_del_curso(curso_id: int, sesion: AsyncSession = Depends(obtener_sesion)):
     """
     CONSULTAR ESTUDIANTES DE UN CURSO
     - Retorna curso y lista de estudiantes matriculados
     """
-    curso = sesion.get(Curso, curso_id)
+    curso = await sesion.get(Curso, curso_id)
     if not curso:
         raise HTTPException(status_code=404, detail="❌ Curso no encontrado")
 
-    # Obtener matrículas del curso
-    matriculas = sesion.exec(select(Matricula).where(Matricula.curso_id == curso_id)).all()
-
-    # Obtener estudiantes de las matrículas
-    estudiantes = []
-    for matricula in matriculas:
-        estudiante = sesion.get(Estudiante, matricula.estudiante_id)
-        if estudiante:
-            estudiantes.append(estudiante)
+    # Obtener estudiantes matriculados y su total en una sola consulta
+    filas = (await sesion.exec(
+        select(Estudiante, func.count().over().label("total"))
+        .join(Matricula, Matricula.estudiante_id == Estudiante.id)
+        .where(Matricula.curso_id == curso_id)
+    )).all()
 
     return {
         "curso": curso,
-        "estudiantes_matriculados": estudiantes,
-        "total_estudiantes": len(estudiantes)
+        "estudiantes_matriculados": [fila.Estudiante for fila in filas],
+        "total_estudiantes": filas[0].total if filas else 0
     }
 
 
 @app.get("/", tags=["Sistema"])
-def estado_sistema():
+async def estado_sistema():
     """
     ESTADO DEL SISTEMA
     - Health check de la aplicación
@@ -362,14 +483,38 @@ def estado_sistema():
     return {
         "mensaje": "✅ Sistema de Gestión Universitaria funcionando correctamente",
         "version": "1.0.0",
-        "endpoints_disponibles": 15
+        "endpoints_disponibles": 16
     }
 
 
 if __name__ == "__main__":
+    import asyncio
+    import multiprocessing
     import uvicorn
 
-    uvicorn.run(app, host="127.0.0.1", port=8000) 
+    workers = multiprocessing.cpu_count()
+
+    async def migrar():
+        await iniciar_aplicacion()
+        await engine.dispose()
+
+    # Preparar la BD una sola vez en el proceso principal, no en cada worker
+    asyncio.run(migrar())
+    os.environ["RUN_MIGRATIONS"] = "0"
+    if workers > 1:
+        # La caché por id es local a cada proceso; con varios workers quedaría desactualizada
+        os.environ["CACHE_POR_ID"] = "0"
+
+    # uvloop + httptools y un worker por núcleo (WAL evita bloqueos entre lectores y el escritor)
+    uvicorn.run(
+        "main:app",
+        host="127.0.0.1",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        workers=workers,
+        log_level="warning"
+    ) 
  
  
  
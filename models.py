@@ -1,3 +1,4 @@
+from sqlalchemy import Column, ForeignKey, Integer, UniqueConstraint
 from sqlmodel import SQLModel, Field, Relationship
 from typing import Optional, List
 
@@ -9,7 +10,10 @@ class Estudiante(SQLModel, table=True):
     email: str = Field(max_length=100)
     semestre: int = Field(ge=1, le=12)
 
-    matriculas: List["Matricula"] = Relationship(back_populates="estudiante")
+    matriculas: List["Matricula"] = Relationship(
+        back_populates="estudiante",
+        sa_relationship_kwargs={"passive_deletes": True}
+    )
 
 
 class Curso(SQLModel, table=True):
@@ -19,14 +23,57 @@ class Curso(SQLModel, table=True):
     creditos: int = Field(ge=1, le=10)
     horario: str = Field(max_length=50)
 
-    matriculas: List["Matricula"] = Relationship(back_populates="curso")
+    matriculas: List["Matricula"] = Relationship(
+        back_populates="curso",
+        sa_relationship_kwargs={"passive_deletes": True}
+    )
 
 
 class Matricula(SQLModel, table=True):
+    __table_args__ = (
+        UniqueConstraint("estudiante_id", "curso_id", name="uq_matricula"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    estudiante_id: int = Field(foreign_key="estudiante.id")
-    curso_id: int = Field(foreign_key="curso.id")
+    # ON DELETE CASCADE: la base de datos elimina las matrículas huérfanas
+    estudiante_id: int = Field(
+        sa_column=Column(
+            Integer,
+            ForeignKey("estudiante.id", ondelete="CASCADE"),
+            nullable=False,
+            index=True
+        )
+    )
+    curso_id: int = Field(
+        sa_column=Column(
+            Integer,
+            ForeignKey("curso.id", ondelete="CASCADE"),
+            nullable=False,
+            index=True
+        )
+    )
 
     estudiante: Estudiante = Relationship(back_populates="matriculas")
-    curso: Curso = Relationship(back_populates="matriculas") 
- 
+    curso: Curso = Relationship(back_populates="matriculas")
+
+
+class MatriculaCrear(SQLModel):
+    estudiante_id: int
+    curso_id: int
+
+
+# Modelos de lectura para los listados (sin metadatos de tabla)
+class EstudianteRead(SQLModel):
+    id: int
+    cedula: str
+    nombre: str
+    email: str
+    semestre: int
+
+
+class CursoRead(SQLModel):
+    id: int
+    codigo: str
+    nombre: str
+    creditos: int
+    horario: str